@@ -1,6 +1,10 @@
+import argparse
+import hashlib
 import json
 import os
 import re
+import shutil
+import time
 import xml.etree.ElementTree as ET
 from datetime import datetime, timezone
 from pathlib import Path
@@ -19,11 +23,19 @@ YOUTUBE_CHANNEL_ID = os.environ.get("YOUTUBE_CHANNEL_ID", "UCVV-a7quRaRVbh6bfrUV
 SELECTED_CREATOR_ID = os.environ.get("CREATOR_ID", "").strip().lower()
 MAX_ITEMS = int(os.environ.get("SOCIAL_FEED_LIMIT", "0"))
 REQUEST_TIMEOUT = int(os.environ.get("SOCIAL_FEED_TIMEOUT", "20"))
+REFRESH_HOURS = float(os.environ.get("SOCIAL_FEED_REFRESH_HOURS", "0"))
+WATCH_INTERVAL = float(os.environ.get("SOCIAL_FEED_WATCH_INTERVAL", "0.5"))
+WATCH_DUE_CHECK_SECONDS = 60
 
 CREATOR_CONFIG_PATH = Path(os.environ.get("CREATOR_CONFIG_PATH", "assets/creators.json"))
-OUTPUT_PATH = Path("assets/social-feed.json")
-IG_COVER_DIR = Path("assets/ig-covers")
-TIKTOK_COVER_DIR = Path("assets/tiktok-covers")
+# Kept outside assets/ so it is neither published nor mistaken for a creator feed.
+STATE_PATH = Path(os.environ.get("SOCIAL_FEED_STATE_PATH", ".social-feed-state.json"))
+DEFAULT_OUTPUT_PATH = Path("assets/social-feed.json")
+DEFAULT_IG_COVER_DIR = Path("assets/ig-covers")
+DEFAULT_TIKTOK_COVER_DIR = Path("assets/tiktok-covers")
+OUTPUT_PATH = DEFAULT_OUTPUT_PATH
+IG_COVER_DIR = DEFAULT_IG_COVER_DIR
+TIKTOK_COVER_DIR = DEFAULT_TIKTOK_COVER_DIR
 
 USER_AGENT = (
     "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
@@ -47,35 +59,40 @@ def log(message):
 
 
 def load_creator_jobs():
+    # Returns the jobs plus every creator ID listed in the config, including
+    # ones skipped below, so callers can tell removed creators from broken ones.
     if not CREATOR_CONFIG_PATH.exists():
         return [
             {
                 "id": "default",
-                "output_path": OUTPUT_PATH,
-                "ig_cover_dir": IG_COVER_DIR,
-                "tiktok_cover_dir": TIKTOK_COVER_DIR,
+                "output_path": DEFAULT_OUTPUT_PATH,
+                "ig_cover_dir": DEFAULT_IG_COVER_DIR,
+                "tiktok_cover_dir": DEFAULT_TIKTOK_COVER_DIR,
                 "instagram_user": INSTAGRAM_USER,
                 "instagram_user_id": INSTAGRAM_USER_ID,
                 "tiktok_user": TIKTOK_USER,
                 "youtube_channel_id": YOUTUBE_CHANNEL_ID,
             }
-        ]
+        ], {"default"}
 
     try:
         data = json.loads(CREATOR_CONFIG_PATH.read_text(encoding="utf-8"))
     except (OSError, ValueError):
-        return []
+        return None, set()
 
     creators = data.get("creators") if isinstance(data, dict) else None
     if not isinstance(creators, dict):
-        return []
+        return None, set()
 
     jobs = []
+    creator_ids = set()
     for creator_id, profile in creators.items():
         normalized_id = str(creator_id).strip().lower()
+        creator_ids.add(normalized_id)
         if SELECTED_CREATOR_ID and normalized_id != SELECTED_CREATOR_ID:
             continue
         if not isinstance(profile, dict):
+            log(f"{normalized_id}: Creator profile is not an object, skipping.")
             continue
 
         feed = profile.get("feed") if isinstance(profile.get("feed"), dict) else {}
@@ -93,7 +110,7 @@ def load_creator_jobs():
             }
         )
 
-    return jobs
+    return jobs, creator_ids
 
 
 def configure_job(job):
@@ -115,6 +132,168 @@ def configure_job(job):
     )
 
 
+JOB_PATH_KEYS = ("output_path", "ig_cover_dir", "tiktok_cover_dir")
+
+
+def job_fingerprint(job):
+    resolved = {key: value.as_posix() if isinstance(value, Path) else value for key, value in job.items()}
+    encoded = json.dumps(resolved, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+def job_paths(job):
+    return {key: job[key].as_posix() for key in JOB_PATH_KEYS}
+
+
+def load_feed_state():
+    if not STATE_PATH.exists():
+        return {}
+    try:
+        data = json.loads(STATE_PATH.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+    creators = data.get("creators") if isinstance(data, dict) else None
+    if not isinstance(creators, dict):
+        return {}
+    return {creator_id: entry for creator_id, entry in creators.items() if isinstance(entry, dict)}
+
+
+def save_feed_state(creators):
+    STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
+    STATE_PATH.write_text(
+        json.dumps({"creators": creators}, indent=2, ensure_ascii=False, sort_keys=True),
+        encoding="utf-8",
+    )
+
+
+def is_refresh_due(entry):
+    if REFRESH_HOURS <= 0:
+        return True
+    refreshed = parse_timestamp_ms(entry.get("refreshed_at"))
+    if not refreshed:
+        return True
+    now_ms = int(datetime.now(timezone.utc).timestamp() * 1000)
+    return now_ms - refreshed >= REFRESH_HOURS * 3_600_000
+
+
+def rewrite_feed_thumbnails(path, prefixes):
+    if not path.is_file():
+        return
+    try:
+        data = json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return
+    if not isinstance(data, dict):
+        return
+
+    changed = False
+    for key in ("youtube", "tiktok", "instagram", "items"):
+        entries = data.get(key) if isinstance(data.get(key), list) else []
+        for item in entries:
+            thumb = item.get("thumbnail") if isinstance(item, dict) else None
+            if not isinstance(thumb, str):
+                continue
+            for old_prefix, new_prefix in prefixes.items():
+                if thumb.startswith(old_prefix):
+                    item["thumbnail"] = new_prefix + thumb[len(old_prefix):]
+                    changed = True
+                    break
+
+    if changed:
+        path.write_text(json.dumps(data, indent=2, ensure_ascii=False), encoding="utf-8")
+
+
+def seed_moved_outputs(creator_id, entry, job):
+    # Copy cached items and covers to a changed path before the rebuild, so
+    # history survives a failed fetch once the old path is cleaned up.
+    recorded = entry.get("paths") if isinstance(entry.get("paths"), dict) else {}
+    moved_cover_dirs = {}
+    for key in JOB_PATH_KEYS:
+        raw_path = recorded.get(key)
+        new_path = job[key]
+        if not isinstance(raw_path, str) or raw_path == new_path.as_posix():
+            continue
+        old_path = Path(raw_path)
+        if key == "output_path":
+            if not old_path.is_file() or new_path.exists():
+                continue
+            new_path.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copy2(old_path, new_path)
+        else:
+            if not old_path.is_dir():
+                continue
+            new_path.mkdir(parents=True, exist_ok=True)
+            for cover in old_path.glob("*.jpg"):
+                target = new_path / cover.name
+                if not target.exists():
+                    shutil.copy2(cover, target)
+            moved_cover_dirs[f"{old_path.as_posix()}/"] = f"{new_path.as_posix()}/"
+        log(f"{creator_id}: Seeded {new_path} from {old_path}")
+
+    # Cached items still point at the old cover dirs; repoint them at the copies.
+    if moved_cover_dirs:
+        rewrite_feed_thumbnails(job["output_path"], moved_cover_dirs)
+
+
+def feed_thumbnails(path):
+    payload = load_existing_payload(path)
+    return {
+        item.get("thumbnail")
+        for key in ("youtube", "tiktok", "instagram", "items")
+        for item in payload[key]
+        if isinstance(item, dict)
+    }
+
+
+OWNED_OUTPUT_DIR = Path("assets")
+OWNED_FEED_PATTERN = "social-feed*.json"
+OWNED_COVER_DIR_PATTERN = "*-covers"
+
+
+PROTECTED_PATHS = {DEFAULT_OUTPUT_PATH, DEFAULT_IG_COVER_DIR, DEFAULT_TIKTOK_COVER_DIR}
+
+
+def remove_stale_outputs(previous_state, state, jobs):
+    # Anything still tracked in the new state is in use, including creators
+    # that are listed in the config but were skipped this run.
+    active_paths = {path for job in jobs for path in job_paths(job).values()}
+    for entry in state.values():
+        recorded = entry.get("paths") if isinstance(entry.get("paths"), dict) else {}
+        active_paths.update(path for path in recorded.values() if isinstance(path, str))
+
+    referenced = feed_thumbnails(DEFAULT_OUTPUT_PATH)
+    for job in jobs:
+        referenced |= feed_thumbnails(job["output_path"])
+    for creator_id, entry in previous_state.items():
+        recorded = entry.get("paths") if isinstance(entry.get("paths"), dict) else {}
+        for key, raw_path in recorded.items():
+            if not isinstance(raw_path, str) or raw_path in active_paths:
+                continue
+            path = Path(raw_path)
+            # Only delete what the runner itself writes: feed JSON files and the
+            # cover images inside assets/*-covers, never arbitrary configured paths.
+            pattern = OWNED_FEED_PATTERN if key == "output_path" else OWNED_COVER_DIR_PATTERN
+            if path.parent != OWNED_OUTPUT_DIR or path in PROTECTED_PATHS or not path.match(pattern):
+                log(f"{creator_id}: Leaving stale output {path} (protected or not managed by the feed runner).")
+                continue
+            if key == "output_path":
+                if not path.is_file():
+                    continue
+                path.unlink()
+            else:
+                if not path.is_dir():
+                    continue
+                for cover in path.glob("*.jpg"):
+                    # A saved feed still shows this cover, so it is not stale yet.
+                    if cover.as_posix() not in referenced:
+                        cover.unlink()
+                if any(path.iterdir()):
+                    log(f"{creator_id}: Removed stale covers from {path}, kept other files.")
+                    continue
+                path.rmdir()
+            log(f"{creator_id}: Removed stale output {path}")
+
+
 def now_iso():
     return datetime.now(timezone.utc).isoformat(timespec="seconds").replace("+00:00", "Z")
 
@@ -397,7 +576,7 @@ def normalize_instagram_item(entry):
     return {
         "source": "instagram",
         "url": f"https://www.instagram.com/p/{shortcode}/",
-        "thumbnail": f"assets/ig-covers/{local_name}",
+        "thumbnail": (IG_COVER_DIR / local_name).as_posix(),
         "title": truncate_text(caption_text, 60) if caption_text else "Instagram Post",
         "description": caption_text,
         "published": published,
@@ -473,7 +652,7 @@ def build_instagram_items_from_covers():
             {
                 "source": "instagram",
                 "url": f"https://www.instagram.com/p/{shortcode}/",
-                "thumbnail": f"assets/ig-covers/{cover.name}",
+                "thumbnail": (IG_COVER_DIR / cover.name).as_posix(),
                 "title": "Instagram Post",
                 "description": "",
                 "published": 0,
@@ -577,7 +756,7 @@ def fetch_tiktok_items():
             {
                 "source": "tiktok",
                 "url": url,
-                "thumbnail": f"assets/tiktok-covers/{local_name}",
+                "thumbnail": (TIKTOK_COVER_DIR / local_name).as_posix(),
                 "title": truncate_text(title_seed, 60) if title_seed else "TikTok Video",
                 "description": description,
                 "published": published,
@@ -658,15 +837,139 @@ def update_current_feed(creator_id):
     )
 
 
-def main():
-    jobs = load_creator_jobs()
+def update_feeds(include_due=True):
+    # Checked before loading: if the file vanishes in between, the load fails
+    # as unreadable instead of silently falling back to the default job.
+    from_config = CREATOR_CONFIG_PATH.exists()
+    jobs, creator_ids = load_creator_jobs()
+    if jobs is None:
+        log(f"Creator config {CREATOR_CONFIG_PATH} is unreadable, skipping update.")
+        return
     if not jobs:
         log("No creator feed jobs configured.")
-        return
+
+    previous_state = load_feed_state()
+    # A CREATOR_ID run or the built-in default job only sees part of the
+    # creators, so keep the others' state untouched and skip cleanup.
+    partial_run = bool(SELECTED_CREATOR_ID) or not from_config
+    state = dict(previous_state) if partial_run else {}
+    failed = []
 
     for job in jobs:
-        configure_job(job)
-        update_current_feed(job["id"])
+        creator_id = job["id"]
+        entry = previous_state.get(creator_id) or {}
+        fingerprint = job_fingerprint(job)
+        if not entry:
+            reason = "new creator"
+        elif entry.get("fingerprint") != fingerprint:
+            reason = "config changed"
+        elif include_due and is_refresh_due(entry):
+            reason = "refresh due"
+        else:
+            log(f"{creator_id}: Config unchanged and refresh not due, skipping.")
+            state[creator_id] = entry
+            continue
+
+        log(f"{creator_id}: Rebuilding feed ({reason}).")
+        try:
+            seed_moved_outputs(creator_id, entry, job)
+            configure_job(job)
+            update_current_feed(creator_id)
+        except Exception as error:
+            # Keep the old entry so the creator is retried on the next run and
+            # its recorded paths stay protected from cleanup.
+            log(f"{creator_id}: Feed rebuild failed: {error}")
+            failed.append(creator_id)
+            if entry:
+                state[creator_id] = entry
+            continue
+
+        state[creator_id] = {
+            "fingerprint": fingerprint,
+            "refreshed_at": now_iso(),
+            "paths": job_paths(job),
+        }
+        # Save progress right away so a later failure or interrupt doesn't
+        # cost the rebuilds that already succeeded.
+        if from_config:
+            save_feed_state({**previous_state, **state})
+
+    # Only creators whose ID is gone from the config count as removed; a
+    # malformed profile keeps its state and outputs until it is fixed.
+    for creator_id in creator_ids - {job["id"] for job in jobs}:
+        if creator_id in previous_state:
+            state[creator_id] = previous_state[creator_id]
+
+    if not partial_run:
+        remove_stale_outputs(previous_state, state, jobs)
+
+    # The built-in default job is not tracked, so a later run with a config
+    # never mistakes its output for a removed creator's.
+    if from_config and state != previous_state:
+        save_feed_state(state)
+
+    if failed:
+        raise RuntimeError(f"Feed rebuild failed for: {', '.join(failed)}")
+
+
+def config_signature():
+    try:
+        stat = CREATOR_CONFIG_PATH.stat()
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+
+def run_watched_update(include_due):
+    # Editors that save by rename and git checkouts can briefly remove the
+    # config; treat that like an unreadable file rather than a config change.
+    if not CREATOR_CONFIG_PATH.exists():
+        log(f"Creator config {CREATOR_CONFIG_PATH} is missing, skipping update.")
+        return
+    try:
+        update_feeds(include_due=include_due)
+    except Exception as error:
+        log(f"Feed update failed: {error}")
+
+
+def watch_feeds():
+    # Without a refresh interval every creator would always be due, so a config
+    # change in watch mode only rebuilds the creators whose job config changed.
+    include_due = REFRESH_HOURS > 0
+    log(f"Watching {CREATOR_CONFIG_PATH} for changes (Ctrl+C to stop).")
+    signature = config_signature()
+    run_watched_update(include_due)
+    last_due_check = time.monotonic()
+
+    try:
+        while True:
+            time.sleep(WATCH_INTERVAL)
+            current = config_signature()
+            if current != signature:
+                signature = current
+                log(f"{CREATOR_CONFIG_PATH} changed, rebuilding affected creators.")
+                run_watched_update(include_due)
+                last_due_check = time.monotonic()
+            elif include_due and time.monotonic() - last_due_check >= WATCH_DUE_CHECK_SECONDS:
+                run_watched_update(include_due)
+                last_due_check = time.monotonic()
+    except KeyboardInterrupt:
+        log("Stopped watching.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update the social feed JSON files for each creator.")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="keep running and rebuild creators whose config changes in the creator config file",
+    )
+    args = parser.parse_args()
+
+    if args.watch:
+        watch_feeds()
+    else:
+        update_feeds()
 
 
 if __name__ == "__main__":